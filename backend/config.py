@@ -22,6 +22,19 @@ class Settings(BaseSettings):
     CHROMA_PERSIST_DIR: str = "./chroma_data"
     CHROMA_COLLECTION_NAME: str = "companies"
 
+    # Embeddings
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    REINDEX_BATCH_SIZE: int = 256
+    REINDEX_THROTTLE_SECONDS: float = 0.5  # pause between re-index batches
+
+    # Segmentation
+    SEGMENT_CHUNK_SIZE: int = 2048  # embeddings held in memory at once
+    SEGMENT_REPRESENTATIVES: int = 3  # companies shown per segment
+
+    # Enrichment
+    AI_CONTEXT_TOKEN_BUDGET: int = 250  # website context tokens per prompt
+    ENRICHMENT_COALESCE_WINDOW: float = 30.0  # seconds to reuse fresh results
+
     # Application
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
@@ -17,10 +17,17 @@ from models.schemas import (
     EnrichmentResponse,
     SearchQuery,
     SearchResult,
+    BulkSearchQuery,
+    BulkSearchResult,
+    ReindexStatus,
+    SegmentationRequest,
+    SegmentsResponse,
     HealthCheck
 )
 from services.enrichment import EnrichmentService
 from services.vector_db import VectorDBService
+from services.reindexer import ReindexService
+from services.segmentation import SegmentationService
 
 
 # Lifespan context manager for startup/shutdown
@@ -31,11 +38,16 @@ async def lifespan(app: FastAPI):
     print("🚀 Starting AI Lead Enrichment Pipeline...")
     app.state.enrichment_service = EnrichmentService()
     app.state.vector_db = VectorDBService()
+    app.state.reindexer = ReindexService(app.state.vector_db)
+    app.state.reindexer.start()
+    app.state.segmentation = SegmentationService(app.state.vector_db)
 
     yield
 
     # Shutdown
     print("👋 Shutting down gracefully...")
+    await app.state.reindexer.stop()
+    await app.state.segmentation.stop()
 
 
 # Initialize FastAPI app
@@ -69,6 +81,12 @@ async def root():
     )
 
 
+async def store_company(enriched: EnrichedCompany):
+    """Store in vector DB and place in the nearest segment"""
+    await app.state.vector_db.add_company(enriched)
+    await app.state.segmentation.assign_company(enriched.name)
+
+
 @app.post("/enrich", response_model=EnrichmentResponse)
 async def enrich_company(company: CompanyInput):
     """
@@ -84,14 +102,13 @@ async def enrich_company(company: CompanyInput):
 
     try:
         # Enrich company data
+        # Enrich and store; concurrent identical requests share one run
         enriched = await app.state.enrichment_service.enrich_company(
             name=company.name,
-            domain=str(company.domain) if company.domain else None
+            domain=str(company.domain) if company.domain else None,
+            store=store_company
         )
 
-        # Store in vector DB
-        await app.state.vector_db.add_company(enriched)
-
         processing_time = time.time() - start_time
 
         return EnrichmentResponse(
@@ -132,9 +149,9 @@ async def enrich_batch(file: UploadFile = File(...)):
             try:
                 enriched = await app.state.enrichment_service.enrich_company(
                     name=row['name'],
-                    domain=row.get('domain')
+                    domain=row.get('domain'),
+                    store=store_company
                 )
-                await app.state.vector_db.add_company(enriched)
                 results.append({"success": True, "company": enriched.name})
             except Exception as e:
                 results.append(
@@ -162,7 +179,8 @@ async def semantic_search(query: SearchQuery):
     try:
         results = await app.state.vector_db.search(
             query=query.query,
-            limit=query.limit
+            limit=query.limit,
+            filters=query.filters
         )
         return results
 
@@ -170,6 +188,26 @@ async def semantic_search(query: SearchQuery):
         raise HTTPException(500, f"Search failed: {str(e)}")
 
 
+@app.post("/search/bulk", response_model=List[BulkSearchResult])
+async def bulk_semantic_search(bulk: BulkSearchQuery):
+    """
+    Run many semantic searches in one request
+
+    Each query keeps its own limit and filters. Queries are embedded in a
+    single batch and resolved with multi-vector ChromaDB queries.
+    Returns: One result group per query, in request order
+    """
+    try:
+        grouped = await app.state.vector_db.search_bulk(bulk.queries)
+        return [
+            BulkSearchResult(query=q.query, results=results)
+            for q, results in zip(bulk.queries, grouped)
+        ]
+
+    except Exception as e:
+        raise HTTPException(500, f"Bulk search failed: {str(e)}")
+
+
 @app.get("/companies", response_model=List[EnrichedCompany])
 async def list_companies(limit: int = 50):
     """List all enriched companies"""
@@ -184,12 +222,56 @@ async def list_companies(limit: int = 50):
 async def delete_company(company_name: str):
     """Delete a company from the database"""
     try:
-        await app.state.vector_db.delete_company(company_name)
+        # Also takes the company out of its segment's statistics
+        await app.state.segmentation.remove_company(company_name)
         return {"success": True, "message": f"Deleted {company_name}"}
     except Exception as e:
         raise HTTPException(500, f"Delete failed: {str(e)}")
 
 
+@app.get("/segments", response_model=SegmentsResponse)
+async def list_segments():
+    """
+    Lead segments with centroids, sizes, representative companies
+    and average fit score
+    """
+    try:
+        return app.state.segmentation.get_segments()
+    except Exception as e:
+        raise HTTPException(500, f"Failed to list segments: {str(e)}")
+
+
+@app.post("/segments", response_model=SegmentsResponse)
+async def build_segments(request: SegmentationRequest):
+    """
+    Cluster all stored companies into segments in the background
+
+    Uses mini-batch k-means over the stored embeddings and saves each
+    company's segment as metadata (searchable via filters.segment).
+    Newly enriched companies are assigned to the nearest segment.
+    """
+    app.state.segmentation.start(request)
+    return app.state.segmentation.get_segments()
+
+
+@app.get("/reindex/status", response_model=ReindexStatus)
+async def reindex_status():
+    """Progress of the background embedding re-index"""
+    return app.state.reindexer.get_status()
+
+
+@app.post("/reindex", response_model=ReindexStatus)
+async def start_reindex():
+    """
+    Start the background re-index if stored embeddings are stale
+
+    Safe to call repeatedly: a running re-index is left alone and a
+    restarted one skips records that were already re-embedded.
+    """
+    app.state.reindexer.start()
+    return app.state.reindexer.get_status()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
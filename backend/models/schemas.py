@@ -26,10 +26,24 @@ class EnrichedCompany(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class SearchFilters(BaseModel):
+    """Metadata filters applied to a semantic search"""
+    industry: Optional[str] = None
+    company_size: Optional[str] = None
+    min_fit_score: Optional[float] = Field(None, ge=0, le=1)
+    segment: Optional[int] = Field(None, ge=0, description="Lead segment id")
+
+
 class SearchQuery(BaseModel):
     """Semantic search query"""
     query: str = Field(..., description="Natural language search query")
     limit: int = Field(5, ge=1, le=50, description="Number of results")
+    filters: Optional[SearchFilters] = None
+
+
+class BulkSearchQuery(BaseModel):
+    """Several semantic search queries resolved in one batch"""
+    queries: List[SearchQuery] = Field(..., min_length=1, max_length=100)
 
 
 class SearchResult(BaseModel):
@@ -38,6 +52,12 @@ class SearchResult(BaseModel):
     similarity_score: float = Field(..., ge=0, le=1)
 
 
+class BulkSearchResult(BaseModel):
+    """Results for one query of a bulk search"""
+    query: str
+    results: List[SearchResult]
+
+
 class EnrichmentResponse(BaseModel):
     """Response after enrichment"""
     success: bool
@@ -46,6 +66,49 @@ class EnrichmentResponse(BaseModel):
     processing_time: float
 
 
+class ReindexStatus(BaseModel):
+    """Progress of the background embedding re-index"""
+    state: str = Field(
+        ..., description="up_to_date, idle, running, completed, stopped or failed")
+    embedding_version: str
+    source_collection: Optional[str] = None
+    target_collection: str
+    total: int = 0
+    processed: int = 0
+    passes: int = 0
+    reindexed: int = 0
+    failed: int = 0
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+class SegmentationRequest(BaseModel):
+    """Parameters for clustering the lead base into segments"""
+    n_clusters: int = Field(8, ge=2, le=100, description="Number of segments")
+    epochs: int = Field(3, ge=1, le=20, description="Passes over the data")
+
+
+class Segment(BaseModel):
+    """One cluster of similar companies"""
+    segment_id: int
+    size: int
+    avg_fit_score: Optional[float] = None
+    representatives: List[str] = []
+    centroid: List[float]
+
+
+class SegmentsResponse(BaseModel):
+    """Current lead segmentation and its fitting state"""
+    state: str = Field(
+        ..., description="none, running, ready, stale or failed")
+    embedding_version: Optional[str] = None
+    total_companies: int = 0
+    segments: List[Segment] = []
+    updated_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
 class HealthCheck(BaseModel):
     """Health check response"""
     status: str
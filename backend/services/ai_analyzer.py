@@ -6,6 +6,7 @@ from typing import Dict, Optional
 import json
 
 from config import settings
+from utils.context_compactor import ContextCompactor
 
 
 class AIAnalyzer:
@@ -15,6 +16,7 @@ class AIAnalyzer:
         genai.configure(api_key=settings.GEMINI_API_KEY)
         # Using gemini-1.5-flash which is free and fast
         self.model = genai.GenerativeModel('gemini-1.5-flash')
+        self.compactor = ContextCompactor()
 
     async def analyze_company(
         self,
@@ -37,10 +39,16 @@ class AIAnalyzer:
         # Build context
         context = f"Company: {name}\n"
         if website_data:
-            context += f"Website: {website_data.get('url', 'N/A')}\n"
-            context += f"Title: {website_data.get('title', 'N/A')}\n"
-            context += f"Description: {website_data.get('description', 'N/A')}\n"
-            context += f"Content: {website_data.get('text_content', 'N/A')[:1000]}\n"
+            # Keep only the most informative content within the token budget
+            compacted = self.compactor.compact(website_data)
+            print(
+                f"  ✂️  Context: {compacted['tokens_after']} of {compacted['tokens_scraped']} "
+                f"scraped tokens sent (saved {compacted['tokens_saved']} vs fixed cut)")
+
+            context += f"Website: {compacted.get('url', 'N/A')}\n"
+            context += f"Title: {compacted.get('title') or 'N/A'}\n"
+            context += f"Description: {compacted.get('description') or 'N/A'}\n"
+            context += f"Content: {compacted['text_content'] or 'N/A'}\n"
 
         prompt = f"""Analyze this company and provide structured insights.
 
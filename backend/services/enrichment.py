@@ -1,8 +1,13 @@
 """
 Main enrichment service orchestrating all steps
 """
-from typing import Optional
+from typing import Awaitable, Callable, Optional, Dict, Tuple
 from datetime import datetime
+from urllib.parse import urlparse
+import asyncio
+import time
+
+from config import settings
 
 from models.schemas import EnrichedCompany
 from utils.scraper import WebScraper
@@ -16,7 +21,104 @@ class EnrichmentService:
         self.scraper = WebScraper()
         self.ai_analyzer = AIAnalyzer()
 
+        # Single-flight state: in-flight enrichments and recently finished
+        # results, both keyed on the normalized company identity
+        self._in_flight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._recent: Dict[Tuple[str, str], Tuple[float, EnrichedCompany]] = {}
+        self.coalesce_window = settings.ENRICHMENT_COALESCE_WINDOW
+
+    @staticmethod
+    def _company_key(name: str, domain: Optional[str] = None) -> Tuple[str, str]:
+        """Normalize name + domain so equivalent requests share one key"""
+        normalized_name = " ".join(name.lower().split())
+
+        host = ""
+        if domain:
+            domain = domain.strip().lower()
+            if "://" not in domain:
+                domain = f"http://{domain}"
+            host = urlparse(domain).hostname or ""
+            if host.startswith("www."):
+                host = host[4:]
+
+        return normalized_name, host
+
+    def _get_recent(self, key: Tuple[str, str]) -> Optional[EnrichedCompany]:
+        """Return a result finished within the grace window, if any"""
+        now = time.monotonic()
+
+        # Drop expired entries so the cache stays bounded
+        expired = [
+            k for k, (finished_at, _) in self._recent.items()
+            if now - finished_at > self.coalesce_window
+        ]
+        for k in expired:
+            del self._recent[k]
+
+        entry = self._recent.get(key)
+        return entry[1] if entry else None
+
     async def enrich_company(
+        self,
+        name: str,
+        domain: Optional[str] = None,
+        store: Optional[Callable[[EnrichedCompany], Awaitable[None]]] = None
+    ) -> EnrichedCompany:
+        """
+        Enrich a company, coalescing concurrent identical requests
+
+        Callers enriching the same company while an enrichment is running
+        await that one and share its result. Results finished within the
+        last ENRICHMENT_COALESCE_WINDOW seconds are reused as well.
+
+        `store` (e.g. embed + save to the vector DB) runs once as part of
+        the shared enrichment, so joined callers don't repeat it.
+        """
+        key = self._company_key(name, domain)
+
+        recent = self._get_recent(key)
+        if recent is not None:
+            print(f"♻️  Reusing fresh enrichment for {name}")
+            return recent
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            print(f"⏳ Joining in-flight enrichment for {name}")
+        else:
+            # Own task, so cancelling any one caller (even the first)
+            # doesn't cancel the enrichment the others are waiting for
+            task = asyncio.create_task(self._run_shared(key, name, domain, store))
+            task.add_done_callback(self._consume_exception)
+            self._in_flight[key] = task
+
+        return await asyncio.shield(task)
+
+    async def _run_shared(
+        self,
+        key: Tuple[str, str],
+        name: str,
+        domain: Optional[str],
+        store: Optional[Callable[[EnrichedCompany], Awaitable[None]]]
+    ) -> EnrichedCompany:
+        """Run the pipeline once for every caller sharing `key`"""
+        try:
+            enriched = await self._run_enrichment(name, domain)
+            if store is not None:
+                await store(enriched)
+        finally:
+            del self._in_flight[key]
+
+        if self.coalesce_window > 0:
+            self._recent[key] = (time.monotonic(), enriched)
+        return enriched
+
+    @staticmethod
+    def _consume_exception(task: asyncio.Task):
+        """Mark failures retrieved when every caller has gone away"""
+        if not task.cancelled():
+            task.exception()
+
+    async def _run_enrichment(
         self,
         name: str,
         domain: Optional[str] = None
@@ -0,0 +1,129 @@
+"""
+Background re-indexing of stale embeddings
+"""
+from typing import Optional, Tuple
+from datetime import datetime
+import asyncio
+
+from config import settings
+from models.schemas import ReindexStatus
+from services.vector_db import VectorDBService
+
+
+class ReindexService:
+    """Re-embeds stored companies when the embedding version changes"""
+
+    # Extra passes catch records shifted past the paging offset by
+    # concurrent deletes; cutover needs a pass that re-indexes nothing
+    MAX_PASSES = 3
+
+    def __init__(self, vector_db: VectorDBService):
+        self.vector_db = vector_db
+        self.batch_size = settings.REINDEX_BATCH_SIZE
+        self.throttle = settings.REINDEX_THROTTLE_SECONDS
+        self._task: Optional[asyncio.Task] = None
+        self.status = ReindexStatus(
+            state="idle" if vector_db.migrating else "up_to_date",
+            embedding_version=vector_db.embedding_version,
+            target_collection=vector_db.target_collection.name
+        )
+
+    def start(self) -> bool:
+        """Start re-indexing in the background if needed and not running"""
+        if not self.vector_db.migrating:
+            return False
+        if self._task is not None and not self._task.done():
+            return False
+
+        # Report "running" right away, before the task gets scheduled
+        source = self.vector_db.collection
+        self.status = ReindexStatus(
+            state="running",
+            embedding_version=self.vector_db.embedding_version,
+            source_collection=source.name,
+            target_collection=self.vector_db.target_collection.name,
+            total=source.count(),
+            started_at=datetime.utcnow()
+        )
+
+        self._task = asyncio.create_task(self._run(source))
+        return True
+
+    async def stop(self):
+        """Cancel a running re-index; progress is kept for the next start"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self, source):
+        """Copy every stale record into the target collection, then cut over"""
+        print(f"🔄 Re-indexing {self.status.total} records from {source.name}")
+
+        try:
+            # Cut over only after a pass that found nothing left to copy
+            for _ in range(self.MAX_PASSES):
+                self.status.passes += 1
+                reindexed, failed = await self._run_pass(source)
+                self.status.failed = failed
+                if reindexed == 0:
+                    break
+            else:
+                raise RuntimeError(
+                    f"Records still changing after {self.MAX_PASSES} passes")
+
+            # Never cut over with records missing from the target
+            if failed:
+                raise RuntimeError(f"{failed} records could not be re-indexed")
+
+            await self.vector_db.complete_migration()
+            self.status.state = "completed"
+
+        except asyncio.CancelledError:
+            self.status.state = "stopped"
+            raise
+
+        except Exception as e:
+            print(f"Re-index failed: {str(e)}")
+            self.status.state = "failed"
+            self.status.error = str(e)
+
+        finally:
+            self.status.finished_at = datetime.utcnow()
+
+    async def _run_pass(self, source) -> Tuple[int, int]:
+        """Walk the source collection once; returns (reindexed, failed)"""
+        reindexed_in_pass = 0
+        failed_in_pass = 0
+        offset = 0
+
+        while True:
+            page = await asyncio.to_thread(
+                source.get,
+                limit=self.batch_size,
+                offset=offset,
+                include=["metadatas"]
+            )
+            if not page['ids']:
+                break
+            offset += len(page['ids'])
+
+            reindexed, failed = await self.vector_db.reindex_batch(
+                page['ids'], page['metadatas'])
+            reindexed_in_pass += reindexed
+            failed_in_pass += failed
+            self.status.reindexed += reindexed
+            # Verification passes re-walk the source; don't move backwards
+            self.status.processed = max(
+                self.status.processed, min(offset, self.status.total))
+
+            # Yield to live traffic between batches
+            await asyncio.sleep(self.throttle)
+
+        return reindexed_in_pass, failed_in_pass
+
+    def get_status(self) -> ReindexStatus:
+        """Current re-index progress"""
+        return self.status
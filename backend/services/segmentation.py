@@ -0,0 +1,560 @@
+"""
+Lead segmentation with mini-batch k-means over stored embeddings
+"""
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime
+import asyncio
+import json
+
+import numpy as np
+
+from config import settings
+from models.schemas import Segment, SegmentationRequest, SegmentsResponse
+from services.vector_db import VectorDBService
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so euclidean k-means ranks by cosine"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Nearest centroid index and squared distance for each row"""
+    distances = (
+        (vectors ** 2).sum(axis=1, keepdims=True)
+        - 2 * vectors @ centroids.T
+        + (centroids ** 2).sum(axis=1)
+    )
+    labels = distances.argmin(axis=1)
+    return labels, np.maximum(distances[np.arange(len(vectors)), labels], 0)
+
+
+def _kmeans_plus_plus(vectors: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Spread initial centroids out with greedy k-means++ seeding
+
+    Several candidates are sampled per step and the one that most reduces
+    the total distance is kept, which avoids seeding two centroids in the
+    same cluster far more reliably than a single draw.
+    """
+    n_trials = 2 + int(np.log(k))
+    centroids = [vectors[rng.integers(len(vectors))]]
+    closest = ((vectors - centroids[0]) ** 2).sum(axis=1)
+
+    for _ in range(1, k):
+        total = closest.sum()
+        if total <= 0:
+            candidates = rng.integers(len(vectors), size=n_trials)
+        else:
+            candidates = rng.choice(len(vectors), size=n_trials, p=closest / total)
+
+        best_closest, best_index = None, None
+        for index in candidates:
+            trial = np.minimum(closest, ((vectors - vectors[index]) ** 2).sum(axis=1))
+            if best_closest is None or trial.sum() < best_closest.sum():
+                best_closest, best_index = trial, index
+
+        centroids.append(vectors[best_index])
+        closest = best_closest
+
+    return np.array(centroids)
+
+
+class SegmentationService:
+    """Clusters stored companies into segments and assigns new ones"""
+
+    # Labels live in two slots that alternate between fits: a new fit is
+    # written to the inactive slot and only becomes active once saved, so
+    # a failed or cancelled fit never touches the labels in use
+    SLOTS = ("a", "b")
+
+    def __init__(self, vector_db: VectorDBService):
+        self.vector_db = vector_db
+        self.chunk_size = settings.SEGMENT_CHUNK_SIZE
+        self.n_representatives = settings.SEGMENT_REPRESENTATIVES
+
+        self._task: Optional[asyncio.Task] = None
+        self.state = "none"
+        self.error: Optional[str] = None
+        self.embedding_version: Optional[str] = None
+        self.updated_at: Optional[datetime] = None
+        self.centroids: Optional[np.ndarray] = None
+        self.stats: List[Dict] = []
+        self.fit_id: Optional[str] = None
+        self.slot: Optional[str] = None
+        self.segments_collection = None
+
+        # Serializes label writes, assignments and deletes so the stats
+        # always match the labels stored on the companies
+        self._lock = asyncio.Lock()
+        self._pending: Set[str] = set()
+        self._fitting: Optional[Dict] = None
+
+        self._load()
+
+    def _collection_name(self, slot: str) -> str:
+        return f"{settings.CHROMA_COLLECTION_NAME}_segments_{slot}"
+
+    def _load(self):
+        """Restore the newest completely saved segmentation from ChromaDB"""
+        saved = []
+        for collection in self.vector_db.client.list_collections():
+            for slot in self.SLOTS:
+                if collection.name == self._collection_name(slot) and (
+                        collection.metadata or {}).get("complete"):
+                    saved.append((collection.metadata["fit_id"], slot, collection))
+        if not saved:
+            return
+
+        fit_id, slot, collection = max(saved, key=lambda entry: entry[0])
+        stored = collection.get(include=["embeddings", "metadatas"])
+        rows = sorted(
+            zip(stored['embeddings'], stored['metadatas']),
+            key=lambda row: row[1]['segment']
+        )
+        stats = [
+            {
+                "size": metadata['size'],
+                "fit_score_sum": metadata['fit_score_sum'],
+                "representatives": json.loads(metadata['representatives'])
+            }
+            for _, metadata in rows
+        ]
+        self._activate(
+            slot, fit_id, np.array([embedding for embedding, _ in rows]),
+            stats, rows[0][1]['embedding_version'], collection)
+        self.state = "ready"
+
+    def _activate(
+        self,
+        slot: str,
+        fit_id: str,
+        centroids: np.ndarray,
+        stats: List[Dict],
+        version: str,
+        collection
+    ):
+        """Make a saved fit the one served, assigned to and filtered on"""
+        self.slot = slot
+        self.fit_id = fit_id
+        self.centroids = centroids
+        self.stats = stats
+        self.embedding_version = version
+        self.updated_at = datetime.fromisoformat(fit_id)
+        self.segments_collection = collection
+        self.vector_db.segment_labels = (
+            self._keys(slot)["segment"], self._keys(slot)["fit"], fit_id)
+
+    @staticmethod
+    def _keys(slot: str) -> Dict[str, str]:
+        """Metadata keys holding a company's label in a slot"""
+        return {
+            "segment": f"segment_{slot}",
+            "fit": f"segment_{slot}_fit",
+            "fit_score": f"segment_{slot}_fit_score"
+        }
+
+    @property
+    def is_current(self) -> bool:
+        """Segments exist and match the vectors searches are served from"""
+        return (
+            self.centroids is not None
+            and self.embedding_version == self.vector_db.serving_version
+        )
+
+    def start(self, request: SegmentationRequest) -> bool:
+        """Fit segments in the background unless a fit is already running"""
+        if self._task is not None and not self._task.done():
+            return False
+
+        # Report "running" right away, before the task gets scheduled
+        self.state = "running"
+        self.error = None
+        self._task = asyncio.create_task(self._run(request))
+        return True
+
+    async def stop(self):
+        """Cancel a running fit; the previous segmentation stays in place"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _read_chunks(self, collection, include: List[str]):
+        """Yield the collection page by page to keep memory bounded"""
+        offset = 0
+        while True:
+            page = await asyncio.to_thread(
+                collection.get,
+                limit=self.chunk_size,
+                offset=offset,
+                include=include
+            )
+            if not page['ids']:
+                break
+            offset += len(page['ids'])
+            yield page
+
+    async def _run(self, request: SegmentationRequest):
+        """Fit centroids, then label every company and collect statistics"""
+        self.state = "running"
+        self.error = None
+        fit_id = datetime.utcnow().isoformat()
+        slot = self.SLOTS[1] if self.slot == self.SLOTS[0] else self.SLOTS[0]
+
+        try:
+            # Holding the scan lock keeps a re-index cutover from dropping
+            # the collection while it is being paged
+            async with self.vector_db.scan_lock:
+                collection = self.vector_db.collection
+                version = self.vector_db.serving_version
+
+                centroids = await self._fit(collection, request)
+                stats = await self._label(collection, centroids, fit_id, slot)
+
+                async with self._lock:
+                    saved = await asyncio.to_thread(
+                        self._save, slot, centroids, stats, version, fit_id)
+                    previous = self.segments_collection
+                    self._activate(slot, fit_id, centroids, stats, version, saved)
+
+            # Only now that the new fit is active is the old one expendable
+            if previous is not None:
+                self.vector_db.client.delete_collection(previous.name)
+
+            self.state = "ready"
+            print(f"✅ Segmented {sum(s['size'] for s in stats)} companies into {len(stats)} segments")
+
+        except asyncio.CancelledError:
+            self.state = "ready" if self.centroids is not None else "none"
+            raise
+
+        except Exception as e:
+            print(f"Segmentation failed: {str(e)}")
+            self.state = "failed"
+            self.error = str(e)
+
+        finally:
+            self._fitting = None
+
+        # Companies enriched while the fit ran may have been paged already
+        pending, self._pending = self._pending, set()
+        for company_name in pending:
+            await self.assign_company(company_name)
+
+    async def _fit(self, collection, request: SegmentationRequest) -> np.ndarray:
+        """
+        Mini-batch k-means over the collection
+
+        Each chunk moves a centroid towards the mean of its assigned
+        points with a per-centroid learning rate of 1 / points seen, so
+        only one chunk and the centroids are ever held in memory.
+        """
+        rng = np.random.default_rng(0)
+        centroids: Optional[np.ndarray] = None
+        counts: Optional[np.ndarray] = None
+
+        for _ in range(request.epochs):
+            async for page in self._read_chunks(collection, ["embeddings"]):
+                vectors = _normalize(np.asarray(page['embeddings'], dtype=np.float32))
+
+                if centroids is None:
+                    k = min(request.n_clusters, len(vectors))
+                    centroids = _kmeans_plus_plus(vectors, k, rng)
+                    counts = np.zeros(k)
+
+                centroids, counts = await asyncio.to_thread(
+                    self._partial_fit, vectors, centroids, counts)
+
+        if centroids is None:
+            raise ValueError("No companies to segment")
+
+        return centroids
+
+    @staticmethod
+    def _partial_fit(
+        vectors: np.ndarray,
+        centroids: np.ndarray,
+        counts: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """One mini-batch k-means update step"""
+        labels, _ = _nearest(vectors, centroids)
+
+        one_hot = np.zeros((len(vectors), len(centroids)), dtype=vectors.dtype)
+        one_hot[np.arange(len(vectors)), labels] = 1
+        batch_counts = one_hot.sum(axis=0)
+        batch_sums = one_hot.T @ vectors
+
+        counts = counts + batch_counts
+        hit = batch_counts > 0
+        rate = (batch_counts[hit] / counts[hit])[:, None]
+        centroids = centroids.copy()
+        centroids[hit] = (
+            (1 - rate) * centroids[hit]
+            + rate * batch_sums[hit] / batch_counts[hit][:, None]
+        )
+        return centroids, counts
+
+    async def _label(
+        self,
+        collection,
+        centroids: np.ndarray,
+        fit_id: str,
+        slot: str
+    ) -> List[Dict]:
+        """Store each company's segment in `slot` and gather statistics"""
+        stats = [
+            {"size": 0, "fit_score_sum": 0.0, "representatives": []}
+            for _ in range(len(centroids))
+        ]
+        # Shared with remove_company, which adjusts both while labeling runs
+        self._fitting = {"fit_id": fit_id, "slot": slot, "stats": stats, "offset": 0}
+
+        while True:
+            # Read and write each page under the lock so deletes can't land
+            # between counting a company and labeling it
+            async with self._lock:
+                page = await asyncio.to_thread(
+                    collection.get,
+                    limit=self.chunk_size,
+                    offset=self._fitting["offset"],
+                    include=["embeddings", "metadatas"]
+                )
+                if not page['ids']:
+                    break
+                self._fitting["offset"] += len(page['ids'])
+
+                vectors = _normalize(np.asarray(page['embeddings'], dtype=np.float32))
+                labels, distances = _nearest(vectors, centroids)
+
+                updates = []
+                for company_id, metadata, label, distance in zip(
+                        page['ids'], page['metadatas'], labels, distances):
+                    fit_score = float(metadata.get("fit_score", 0.5))
+                    self._record(stats[label], company_id, fit_score, float(distance))
+                    updates.append(
+                        self._label_metadata(slot, int(label), fit_id, fit_score))
+
+                await self.vector_db.update_metadata(page['ids'], updates)
+
+        return stats
+
+    @classmethod
+    def _label_metadata(cls, slot: str, label: int, fit_id: str, fit_score: float) -> Dict:
+        """
+        Segment keys merged into a company's metadata
+
+        The fit id and fit score record which fit counted the company and
+        with what score, so later moves and deletes can undo exactly what
+        was added to the stats.
+        """
+        keys = cls._keys(slot)
+        return {
+            keys["segment"]: label,
+            keys["fit"]: fit_id,
+            keys["fit_score"]: fit_score
+        }
+
+    def _record(self, stat: Dict, company_name: str, fit_score: float, distance: float):
+        """Add one company to a segment's running statistics"""
+        stat["size"] += 1
+        stat["fit_score_sum"] += fit_score
+
+        # Representatives are the companies closest to the centroid
+        representatives = stat["representatives"]
+        representatives.append([company_name, distance])
+        representatives.sort(key=lambda r: r[1])
+        del representatives[self.n_representatives:]
+
+    @staticmethod
+    def _unrecord(stat: Dict, company_name: str, fit_score: float):
+        """Remove one company from a segment's running statistics"""
+        stat["size"] = max(0, stat["size"] - 1)
+        stat["fit_score_sum"] -= fit_score
+        stat["representatives"] = [
+            r for r in stat["representatives"] if r[0] != company_name
+        ]
+
+    def _save(
+        self,
+        slot: str,
+        centroids: np.ndarray,
+        stats: List[Dict],
+        version: str,
+        fit_id: str
+    ):
+        """
+        Persist a fit into its slot's collection and return it
+
+        The slot being written is never the active one, so a failure here
+        leaves the current segmentation intact. The collection is marked
+        complete last; _load ignores it until then.
+        """
+        # Recreate rather than upsert: a new embedding model may change
+        # the centroid dimension and k may have shrunk
+        name = self._collection_name(slot)
+        try:
+            self.vector_db.client.delete_collection(name)
+        except ValueError:
+            pass
+        collection = self.vector_db.client.create_collection(
+            name=name,
+            metadata={"description": "Lead segment centroids", "complete": False}
+        )
+
+        collection.add(
+            ids=[f"segment-{i}" for i in range(len(centroids))],
+            embeddings=centroids.tolist(),
+            metadatas=[
+                self._segment_metadata(i, stat, version, fit_id)
+                for i, stat in enumerate(stats)
+            ]
+        )
+        collection.modify(metadata={
+            "description": "Lead segment centroids",
+            "complete": True,
+            "fit_id": fit_id
+        })
+        return collection
+
+    def _persist_segment(self, index: int):
+        """Write one segment's updated statistics back to ChromaDB"""
+        self.segments_collection.update(
+            ids=[f"segment-{index}"],
+            metadatas=[self._segment_metadata(
+                index, self.stats[index], self.embedding_version, self.fit_id)]
+        )
+
+    @staticmethod
+    def _segment_metadata(index: int, stat: Dict, version: str, updated_at: str) -> Dict:
+        return {
+            "segment": index,
+            "size": stat["size"],
+            "fit_score_sum": stat["fit_score_sum"],
+            "representatives": json.dumps(stat["representatives"]),
+            "embedding_version": version,
+            "updated_at": updated_at
+        }
+
+    async def assign_company(self, company_name: str) -> Optional[int]:
+        """
+        Assign a newly stored company to its nearest segment
+
+        Centroids stay fixed; sizes, average fit score and representatives
+        are updated incrementally until the next full fit. A company that
+        was already counted is moved out of its previous segment first.
+        Companies stored while a fit is running are queued and assigned
+        once it finishes.
+        Returns: Segment id, or None if there is no current segmentation
+        """
+        try:
+            async with self._lock:
+                if self.state == "running":
+                    self._pending.add(company_name)
+                    return None
+                if not self.is_current:
+                    return None
+
+                record = self.vector_db.collection.get(
+                    ids=[company_name], include=["embeddings", "metadatas"])
+                if not record['ids']:
+                    return None
+
+                vector = _normalize(np.asarray(record['embeddings'], dtype=np.float32))
+                labels, distances = _nearest(vector, self.centroids)
+                label = int(labels[0])
+                metadata = record['metadatas'][0]
+                fit_score = float(metadata.get("fit_score", 0.5))
+
+                counted = self._counted(metadata, self.slot, self.fit_id)
+                if counted == (label, fit_score):
+                    return label
+                if counted is not None:
+                    previous, previous_score = counted
+                    self._unrecord(self.stats[previous], company_name, previous_score)
+                    self._persist_segment(previous)
+
+                self._record(self.stats[label], company_name, fit_score, float(distances[0]))
+                self._persist_segment(label)
+
+                await self.vector_db.update_metadata(
+                    [company_name],
+                    [self._label_metadata(self.slot, label, self.fit_id, fit_score)])
+
+                return label
+
+        except Exception as e:
+            print(f"Segment assignment failed for {company_name}: {str(e)}")
+            return None
+
+    async def remove_company(self, company_name: str):
+        """Delete a company and take it out of its segment's statistics"""
+        async with self._lock:
+            record = self.vector_db.collection.get(
+                ids=[company_name], include=["metadatas"])
+
+            if record['ids']:
+                metadata = record['metadatas'][0]
+
+                if self._fitting is not None:
+                    counted = self._counted(
+                        metadata, self._fitting["slot"], self._fitting["fit_id"])
+                    if counted is not None:
+                        # Already paged by _label: undo its count and keep
+                        # the paging offset from skipping the next company
+                        self._unrecord(
+                            self._fitting["stats"][counted[0]], company_name, counted[1])
+                        self._fitting["offset"] -= 1
+                elif self.is_current:
+                    counted = self._counted(metadata, self.slot, self.fit_id)
+                    if counted is not None:
+                        self._unrecord(self.stats[counted[0]], company_name, counted[1])
+                        self._persist_segment(counted[0])
+
+            await self.vector_db.delete_company(company_name)
+
+    @classmethod
+    def _counted(
+        cls,
+        metadata: Dict,
+        slot: Optional[str],
+        fit_id: Optional[str]
+    ) -> Optional[Tuple[int, float]]:
+        """(segment, fit score) a company was counted with in a fit, if any"""
+        if slot is None:
+            return None
+        keys = cls._keys(slot)
+        if fit_id is None or metadata.get(keys["fit"]) != fit_id:
+            return None
+        return int(metadata[keys["segment"]]), float(metadata[keys["fit_score"]])
+
+    def get_segments(self) -> SegmentsResponse:
+        """Current segments with centroids, sizes and representatives"""
+        state = self.state
+        if state == "ready" and not self.is_current:
+            state = "stale"
+
+        segments = []
+        if self.centroids is not None:
+            for i, (centroid, stat) in enumerate(zip(self.centroids, self.stats)):
+                segments.append(Segment(
+                    segment_id=i,
+                    size=stat["size"],
+                    avg_fit_score=(
+                        stat["fit_score_sum"] / stat["size"] if stat["size"] else None
+                    ),
+                    representatives=[name for name, _ in stat["representatives"]],
+                    centroid=centroid.tolist()
+                ))
+
+        return SegmentsResponse(
+            state=state,
+            embedding_version=self.embedding_version,
+            total_companies=sum(s.size for s in segments),
+            segments=segments,
+            updated_at=self.updated_at,
+            error=self.error
+        )
@@ -4,11 +4,26 @@ Vector database operations using ChromaDB
 import chromadb
 from chromadb.config import Settings as ChromaSettings
 from sentence_transformers import SentenceTransformer
-from typing import List, Optional
+from typing import List, Optional, Dict, Tuple
+from datetime import datetime
+import asyncio
+import hashlib
 import json
 
 from config import settings
-from models.schemas import EnrichedCompany, SearchResult
+from models.schemas import (
+    EnrichedCompany,
+    SearchFilters,
+    SearchQuery,
+    SearchResult
+)
+
+
+# Bump whenever _create_document_text changes so stored vectors get re-indexed
+DOCUMENT_TEMPLATE_VERSION = 1
+
+# Model used before embedding versions were tracked
+LEGACY_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 
 
 class VectorDBService:
@@ -21,17 +36,111 @@ class VectorDBService:
             anonymized_telemetry=False
         ))
 
-        # Get or create collection
-        self.collection = self.client.get_or_create_collection(
-            name=settings.CHROMA_COLLECTION_NAME,
-            metadata={"description": "Enriched company data"}
+        # Each embedding version gets its own collection, so a model change
+        # (which may change vector dimensions) never mixes vector spaces
+        self.embedding_version = (
+            f"{settings.EMBEDDING_MODEL}@template-v{DOCUMENT_TEMPLATE_VERSION}"
+        )
+        self.target_collection = self.client.get_or_create_collection(
+            name=self._collection_name(self.embedding_version),
+            metadata=self._collection_metadata(complete=False)
         )
+        self.target_model = SentenceTransformer(settings.EMBEDDING_MODEL)
+
+        # Searches are served from the newest fully indexed collection.
+        # While a re-index is pending that is an older collection, queried
+        # with the model it was built with.
+        source = self._find_source_collection()
+        if source is None:
+            if not self._is_complete(self.target_collection):
+                self.target_collection.modify(
+                    metadata=self._collection_metadata(complete=True))
+            self.collection = self.target_collection
+            self.embedding_model = self.target_model
+        else:
+            source_model = (source.metadata or {}).get(
+                "embedding_model", LEGACY_EMBEDDING_MODEL)
+            self.collection = source
+            self.embedding_model = (
+                self.target_model if source_model == settings.EMBEDDING_MODEL
+                else SentenceTransformer(source_model)
+            )
+            print(
+                f"⚠️  Collection {source.name} is stale, re-index to {self.embedding_version} pending")
+
+        # Serializes writes to the target collection between live traffic
+        # and the background re-indexer
+        self._write_lock = asyncio.Lock()
+        # Held by full-collection scans (segmentation fits) so the cutover
+        # never drops the collection they are paging
+        self.scan_lock = asyncio.Lock()
+
+        # (label key, fit key, fit id) of the active segmentation, set by
+        # the segmentation service; segment filters only match those labels
+        self.segment_labels: Optional[Tuple[str, str, str]] = None
 
-        # Initialize embedding model
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
         print(
             f"✅ Vector DB initialized. Collection: {self.collection.count()} documents")
 
+    def _collection_name(self, version: str) -> str:
+        """ChromaDB-safe collection name for an embedding version"""
+        digest = hashlib.md5(version.encode()).hexdigest()[:8]
+        return f"{settings.CHROMA_COLLECTION_NAME}_{digest}"
+
+    def _collection_metadata(self, complete: bool) -> Dict:
+        """Collection metadata describing the current embedding version"""
+        metadata = {
+            "description": "Enriched company data",
+            "embedding_version": self.embedding_version,
+            "embedding_model": settings.EMBEDDING_MODEL,
+            "template_version": DOCUMENT_TEMPLATE_VERSION,
+            "reindex_complete": complete
+        }
+        if complete:
+            metadata["completed_at"] = datetime.utcnow().isoformat()
+        return metadata
+
+    @staticmethod
+    def _is_complete(collection) -> bool:
+        return bool((collection.metadata or {}).get("reindex_complete"))
+
+    def _find_source_collection(self):
+        """Newest complete collection of an older version holding data, if any"""
+        if self._is_complete(self.target_collection):
+            return None
+
+        base = settings.CHROMA_COLLECTION_NAME
+        candidates = []
+        for collection in self.client.list_collections():
+            if collection.name == self.target_collection.name:
+                continue
+            # The un-suffixed collection predates versioning and is
+            # implicitly complete
+            if collection.name == base or (
+                collection.name.startswith(f"{base}_")
+                and self._is_complete(collection)
+            ):
+                if collection.count() > 0:
+                    candidates.append(collection)
+
+        if not candidates:
+            return None
+
+        return max(
+            candidates,
+            key=lambda c: (c.metadata or {}).get("completed_at", "")
+        )
+
+    @property
+    def migrating(self) -> bool:
+        """True while searches are served from a stale collection"""
+        return self.collection.name != self.target_collection.name
+
+    @property
+    def serving_version(self) -> str:
+        """Embedding version of the collection searches are served from"""
+        return (self.collection.metadata or {}).get("embedding_version", "legacy")
+
     def _create_document_text(self, company: EnrichedCompany) -> str:
         """Create searchable text from company data"""
         parts = [
@@ -49,6 +158,18 @@ class VectorDBService:
 
         return " | ".join(parts)
 
+    def _create_metadata(self, company: EnrichedCompany, version: str) -> Dict:
+        """Create record metadata, tagged with its embedding version"""
+        return {
+            "name": company.name,
+            "domain": company.domain or "",
+            "industry": company.industry or "",
+            "company_size": company.company_size or "",
+            "fit_score": company.fit_score or 0.5,
+            "embedding_version": version,
+            "raw_data": json.dumps(company.dict(), default=str)
+        }
+
     async def add_company(self, company: EnrichedCompany):
         """Add enriched company to vector database"""
         try:
@@ -56,22 +177,40 @@ class VectorDBService:
             doc_text = self._create_document_text(company)
 
             # Generate embedding
-            embedding = self.embedding_model.encode(doc_text).tolist()
-
-            # Store in ChromaDB
-            self.collection.add(
-                ids=[company.name],
-                embeddings=[embedding],
-                documents=[doc_text],
-                metadatas=[{
-                    "name": company.name,
-                    "domain": company.domain or "",
-                    "industry": company.industry or "",
-                    "company_size": company.company_size or "",
-                    "fit_score": company.fit_score or 0.5,
-                    "raw_data": json.dumps(company.dict(), default=str)
-                }]
-            )
+            embedding = self.target_model.encode(doc_text).tolist()
+
+            # Store in ChromaDB (upsert so re-enrichments replace the old record)
+            async with self._write_lock:
+                # Carry over segment keys so segmentation can tell a
+                # re-added company from a new one
+                previous = self.collection.get(
+                    ids=[company.name], include=["metadatas"])
+                previous_metadata = previous['metadatas'][0] if previous['ids'] else {}
+                segment_keys = {
+                    key: value for key, value in previous_metadata.items()
+                    if key.startswith("segment")
+                }
+
+                metadata = self._create_metadata(company, self.embedding_version)
+                if not self.migrating:
+                    metadata.update(segment_keys)
+                self.target_collection.upsert(
+                    ids=[company.name],
+                    embeddings=[embedding],
+                    documents=[doc_text],
+                    metadatas=[metadata]
+                )
+
+                # Keep the serving collection current until cutover
+                if self.migrating:
+                    metadata = self._create_metadata(company, self.serving_version)
+                    metadata.update(segment_keys)
+                    self.collection.upsert(
+                        ids=[company.name],
+                        embeddings=[self.embedding_model.encode(doc_text).tolist()],
+                        documents=[doc_text],
+                        metadatas=[metadata]
+                    )
 
             print(f"✅ Added {company.name} to vector DB")
 
@@ -79,7 +218,152 @@ class VectorDBService:
             print(f"❌ Failed to add {company.name}: {str(e)}")
             raise
 
-    async def search(self, query: str, limit: int = 5) -> List[SearchResult]:
+    async def reindex_batch(self, ids: List[str], metadatas: List[Dict]) -> Tuple[int, int]:
+        """
+        Re-embed a batch of stale records into the target collection
+
+        Documents are rebuilt from the stored company data, so no scraping
+        or AI analysis is repeated. Records already present in the target
+        (from an earlier run or a live write) are skipped.
+
+        Returns: (reindexed, failed) counts
+        """
+        existing = set((await asyncio.to_thread(
+            self.target_collection.get, ids=ids, include=[]))['ids'])
+
+        pending_ids, companies = [], []
+        failed = 0
+        for company_id, metadata in zip(ids, metadatas):
+            if company_id in existing:
+                continue
+            try:
+                companies.append(EnrichedCompany(**json.loads(metadata['raw_data'])))
+                pending_ids.append(company_id)
+            except Exception as e:
+                print(f"Re-index skipped {company_id}: {str(e)}")
+                failed += 1
+
+        if not pending_ids:
+            return 0, failed
+
+        documents = [self._create_document_text(c) for c in companies]
+        embeddings = (await asyncio.to_thread(
+            self.target_model.encode, documents)).tolist()
+
+        async with self._write_lock:
+            # Re-check under the lock: live writes may have added newer data
+            # and deletes may have removed records since the batch was read
+            def store() -> int:
+                in_target = set(self.target_collection.get(
+                    ids=pending_ids, include=[])['ids'])
+                in_source = set(self.collection.get(
+                    ids=pending_ids, include=[])['ids'])
+                keep = [
+                    i for i, company_id in enumerate(pending_ids)
+                    if company_id in in_source and company_id not in in_target
+                ]
+                if keep:
+                    self.target_collection.upsert(
+                        ids=[pending_ids[i] for i in keep],
+                        embeddings=[embeddings[i] for i in keep],
+                        documents=[documents[i] for i in keep],
+                        metadatas=[
+                            self._create_metadata(companies[i], self.embedding_version)
+                            for i in keep
+                        ]
+                    )
+                return len(keep)
+
+            reindexed = await asyncio.to_thread(store)
+
+        return reindexed, failed
+
+    async def update_metadata(self, ids: List[str], metadatas: List[Dict]):
+        """
+        Merge metadata keys into existing records of the serving collection
+
+        ChromaDB merges on update, so callers pass only the keys they own
+        and never overwrite a newer enrichment with a stale snapshot.
+        """
+        async with self._write_lock:
+            await asyncio.to_thread(
+                self.collection.update, ids=ids, metadatas=metadatas)
+
+    async def complete_migration(self):
+        """
+        Switch searches to the fully re-indexed target collection
+
+        The stale collection is deleted afterwards so each version bump
+        doesn't leave another full copy of the data behind. Waits for any
+        running scan to finish first.
+        """
+        async with self.scan_lock, self._write_lock:
+            self.target_collection.modify(
+                metadata=self._collection_metadata(complete=True))
+            previous = self.collection.name
+            self.collection = self.target_collection
+            self.embedding_model = self.target_model
+
+            self.client.delete_collection(previous)
+
+        print(f"✅ Cut over from {previous} to {self.collection.name}")
+
+    def _build_where(self, filters: Optional[SearchFilters]) -> Optional[Dict]:
+        """Translate search filters into a ChromaDB where clause"""
+        if not filters:
+            return None
+
+        conditions = []
+        if filters.industry:
+            conditions.append({"industry": filters.industry})
+        if filters.company_size:
+            conditions.append({"company_size": filters.company_size})
+        if filters.min_fit_score is not None:
+            conditions.append({"fit_score": {"$gte": filters.min_fit_score}})
+        if filters.segment is not None:
+            if self.segment_labels is None:
+                # No segmentation yet, so no company can be in a segment
+                conditions.append({"segment_a_fit": "none"})
+            else:
+                label_key, fit_key, fit_id = self.segment_labels
+                conditions.append({label_key: filters.segment})
+                conditions.append({fit_key: fit_id})
+
+        if not conditions:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        return {"$and": conditions}
+
+    def _parse_results(self, results: Dict, index: int = 0) -> List[SearchResult]:
+        """Convert one row of a ChromaDB query response to search results"""
+        search_results = []
+
+        if results['ids'] and results['ids'][index]:
+            for i, company_id in enumerate(results['ids'][index]):
+                metadata = results['metadatas'][index][i]
+                distance = results['distances'][index][i] if results['distances'] else 0
+
+                # Convert distance to similarity score (0-1)
+                similarity = 1 / (1 + distance)
+
+                # Parse raw data
+                raw_data = json.loads(metadata['raw_data'])
+                company = EnrichedCompany(**raw_data)
+
+                search_results.append(SearchResult(
+                    company=company,
+                    similarity_score=similarity
+                ))
+
+        return search_results
+
+    async def search(
+        self,
+        query: str,
+        limit: int = 5,
+        filters: Optional[SearchFilters] = None
+    ) -> List[SearchResult]:
         """Semantic search for companies"""
         try:
             # Generate query embedding
@@ -88,34 +372,58 @@ class VectorDBService:
             # Search in ChromaDB
             results = self.collection.query(
                 query_embeddings=[query_embedding],
-                n_results=limit
+                n_results=limit,
+                where=self._build_where(filters)
             )
 
-            # Parse results
-            search_results = []
+            return self._parse_results(results)
+
+        except Exception as e:
+            print(f"Search failed: {str(e)}")
+            return []
+
+    async def search_bulk(self, queries: List[SearchQuery]) -> List[List[SearchResult]]:
+        """
+        Run many semantic searches at once
 
-            if results['ids'] and results['ids'][0]:
-                for i, company_id in enumerate(results['ids'][0]):
-                    metadata = results['metadatas'][0][i]
-                    distance = results['distances'][0][i] if results['distances'] else 0
+        All query texts are encoded in a single batch. Queries sharing the
+        same filters are sent to ChromaDB as one multi-vector query, so a
+        typical bulk request costs one encode and one query. Results are
+        returned in the same order as the input queries.
+        """
+        try:
+            embeddings = self.embedding_model.encode(
+                [q.query for q in queries]
+            ).tolist()
 
-                    # Convert distance to similarity score (0-1)
-                    similarity = 1 / (1 + distance)
+            # Group query indexes by their where clause (ChromaDB applies
+            # a single filter to every vector in a query call)
+            groups: Dict[str, List[int]] = {}
+            wheres: Dict[str, Optional[Dict]] = {}
+            for i, q in enumerate(queries):
+                where = self._build_where(q.filters)
+                group_key = json.dumps(where, sort_keys=True)
+                groups.setdefault(group_key, []).append(i)
+                wheres[group_key] = where
 
-                    # Parse raw data
-                    raw_data = json.loads(metadata['raw_data'])
-                    company = EnrichedCompany(**raw_data)
+            grouped_results: List[List[SearchResult]] = [[] for _ in queries]
+            for group_key, indexes in groups.items():
+                results = self.collection.query(
+                    query_embeddings=[embeddings[i] for i in indexes],
+                    n_results=max(queries[i].limit for i in indexes),
+                    where=wheres[group_key]
+                )
 
-                    search_results.append(SearchResult(
-                        company=company,
-                        similarity_score=similarity
-                    ))
+                # Results are sorted by distance, so trimming keeps the top K
+                for row, i in enumerate(indexes):
+                    grouped_results[i] = self._parse_results(
+                        results, row)[:queries[i].limit]
 
-            return search_results
+            return grouped_results
 
         except Exception as e:
-            print(f"Search failed: {str(e)}")
-            return []
+            print(f"Bulk search failed: {str(e)}")
+            return [[] for _ in queries]
 
     async def list_all(self, limit: int = 50) -> List[EnrichedCompany]:
         """List all companies in database"""
@@ -137,7 +445,10 @@ class VectorDBService:
     async def delete_company(self, company_name: str):
         """Delete company from database"""
         try:
-            self.collection.delete(ids=[company_name])
+            async with self._write_lock:
+                self.collection.delete(ids=[company_name])
+                if self.migrating:
+                    self.target_collection.delete(ids=[company_name])
             print(f"✅ Deleted {company_name}")
         except Exception as e:
             print(f"Delete failed: {str(e)}")
@@ -0,0 +1,63 @@
+"""
+Fixtures compartidos para tests de servicios con ChromaDB en memoria
+"""
+import json
+import uuid
+import zlib
+
+import chromadb
+import numpy as np
+import pytest
+from chromadb.config import Settings as ChromaSettings
+
+from config import settings
+from models.schemas import EnrichedCompany
+
+
+class FakeEmbeddingModel:
+    """Encoder determinista (bag of words) en lugar de SentenceTransformer"""
+
+    DIM = 16
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    def encode(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        vectors = np.zeros((1 if single else len(texts), self.DIM), dtype=np.float32)
+        for row, text in enumerate([texts] if single else texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode()) % self.DIM] += 1.0
+        return vectors[0] if single else vectors
+
+
+def company_metadata(name: str, **fields) -> dict:
+    """Metadata como la guardaba VectorDBService antes del versionado"""
+    company = EnrichedCompany(name=name, **fields)
+    return {
+        "name": name,
+        "fit_score": company.fit_score or 0.5,
+        "raw_data": json.dumps(company.dict(), default=str)
+    }
+
+
+@pytest.fixture
+def chroma_client(monkeypatch):
+    """Cliente ChromaDB con nombres de colección únicos por test"""
+    monkeypatch.setattr(
+        settings, "CHROMA_COLLECTION_NAME", f"companies_{uuid.uuid4().hex[:8]}")
+    monkeypatch.setattr(
+        "services.vector_db.SentenceTransformer", FakeEmbeddingModel)
+    return chromadb.Client(ChromaSettings(
+        persist_directory=settings.CHROMA_PERSIST_DIR,
+        anonymized_telemetry=False
+    ))
+
+
+@pytest.fixture
+def legacy_collection(chroma_client):
+    """Colección sin versión, como la creaba el código anterior"""
+    return chroma_client.get_or_create_collection(
+        name=settings.CHROMA_COLLECTION_NAME,
+        metadata={"description": "Enriched company data"}
+    )
@@ -0,0 +1,68 @@
+"""
+Tests para la compactación de contexto del prompt
+"""
+from utils.context_compactor import (
+    LEGACY_CONTENT_CHARS,
+    ContextCompactor,
+    estimate_tokens
+)
+
+
+WEBSITE_DATA = {
+    "title": "Acme Payments",
+    "description": "Payments for LatAm",
+    "url": "https://acme.example",
+    "text_content": (
+        "Home About Pricing Blog Contact Login "
+        "We use cookies to improve your experience. Accept all. "
+        "Acme builds payment infrastructure for online businesses in Latin America. "
+        "Acme builds payment infrastructure for online businesses in Latin America. "
+        "Our API lets developers accept cards, transfers and wallets with a single integration. "
+        "© 2024 Acme Inc. All rights reserved."
+    )
+}
+
+
+def test_compact_drops_boilerplate_and_duplicates():
+    """Test que se eliminan banners de cookies y frases repetidas"""
+    result = ContextCompactor(token_budget=200).compact(WEBSITE_DATA)
+    text = result["text_content"]
+    assert "cookies" not in text
+    assert "All rights reserved" not in text
+    assert text.count("Acme builds payment infrastructure") == 1
+    assert result["tokens_after"] < result["tokens_scraped"]
+
+
+def test_compact_keeps_tech_stack_sentences():
+    """Test que frases con tecnologías o productos no se descartan"""
+    data = {
+        **WEBSITE_DATA,
+        "text_content": (
+            "Our SDK is written in JavaScript and TypeScript and integrates with React. "
+            "Customers sign in to the dashboard to manage payouts and subscribe to webhooks. "
+            "We use cookies to improve your experience."
+        )
+    }
+    text = ContextCompactor(token_budget=400).compact(data)["text_content"]
+    assert "JavaScript and TypeScript" in text
+    assert "sign in to the dashboard" in text
+    assert "cookies" not in text
+
+
+def test_compact_savings_measured_against_legacy_cut():
+    """Test que el ahorro se mide contra el corte fijo de 1000 caracteres"""
+    data = {**WEBSITE_DATA, "text_content": WEBSITE_DATA["text_content"] * 20}
+    result = ContextCompactor(token_budget=250).compact(data)
+    baseline = (
+        estimate_tokens(data["title"]) + estimate_tokens(data["description"])
+        + estimate_tokens(data["text_content"][:LEGACY_CONTENT_CHARS])
+    )
+    assert result["tokens_saved"] == baseline - result["tokens_after"]
+    assert result["tokens_after"] <= 250
+
+
+def test_compact_respects_token_budget():
+    """Test que el contexto compactado no excede el presupuesto"""
+    result = ContextCompactor(token_budget=30).compact(WEBSITE_DATA)
+    assert result["tokens_after"] <= 30
+    assert estimate_tokens(result["text_content"]) > 0
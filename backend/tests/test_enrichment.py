@@ -0,0 +1,117 @@
+"""
+Tests del coalescing de enriquecimientos concurrentes
+"""
+import asyncio
+
+import pytest
+
+from models.schemas import EnrichedCompany
+from services.enrichment import EnrichmentService
+
+
+@pytest.fixture
+def service():
+    """EnrichmentService con un pipeline falso que cuenta ejecuciones"""
+    service = EnrichmentService()
+    service.calls = 0
+    service.release = asyncio.Event()
+    service.fail = False
+
+    async def fake_run(name, domain=None):
+        service.calls += 1
+        await service.release.wait()
+        if service.fail:
+            raise ValueError("scrape failed")
+        return EnrichedCompany(name=name, domain=domain)
+
+    service._run_enrichment = fake_run
+    return service
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_run(service):
+    """Test que llamadas concurrentes equivalentes comparten una ejecución"""
+    tasks = [
+        asyncio.create_task(service.enrich_company("Acme", "https://acme.com")),
+        asyncio.create_task(service.enrich_company(" acme ", "https://www.acme.com/")),
+        asyncio.create_task(service.enrich_company("ACME", "acme.com")),
+    ]
+    await asyncio.sleep(0)
+    service.release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert service.calls == 1
+    assert all(result is results[0] for result in results)
+
+
+@pytest.mark.asyncio
+async def test_failure_reaches_waiters_and_is_not_cached(service):
+    """Test que un error llega a todos los que esperan y no se cachea"""
+    service.fail = True
+    tasks = [
+        asyncio.create_task(service.enrich_company("Acme")) for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    service.release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert service.calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+    service.fail = False
+    await service.enrich_company("Acme")
+    assert service.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_grace_window_expires(service):
+    """Test que el resultado reciente se reutiliza sólo dentro de la ventana"""
+    service.coalesce_window = 0.05
+    service.release.set()
+
+    first = await service.enrich_company("Acme")
+    assert await service.enrich_company("Acme") is first
+    assert service.calls == 1
+
+    await asyncio.sleep(0.1)
+    assert await service.enrich_company("Acme") is not first
+    assert service.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_fail_the_others(service):
+    """Test que cancelar al primer caller no afecta a los demás"""
+    leader = asyncio.create_task(service.enrich_company("Acme"))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(service.enrich_company("Acme"))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+    service.release.set()
+    result = await waiter
+    assert result.name == "Acme"
+    assert service.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_store_runs_once_for_shared_result(service):
+    """Test que el guardado se hace una sola vez para callers coalescidos"""
+    stored = []
+
+    async def store(enriched):
+        stored.append(enriched)
+
+    tasks = [
+        asyncio.create_task(service.enrich_company("Acme", store=store))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    service.release.set()
+    await asyncio.gather(*tasks)
+
+    # Los que llegan dentro de la ventana tampoco vuelven a guardar
+    await service.enrich_company("Acme", store=store)
+    assert len(stored) == 1
@@ -44,6 +44,12 @@ def test_search_endpoint_missing_query(client):
     assert response.status_code == 422
 
 
+def test_bulk_search_endpoint_empty_queries(client):
+    """Test que /search/bulk requiere al menos una query"""
+    response = client.post("/search/bulk", json={"queries": []})
+    assert response.status_code == 422
+
+
 def test_list_companies(client):
     """Test que /companies devuelve lista (puede estar vacía)"""
     response = client.get("/companies")
@@ -60,6 +66,12 @@ def test_list_companies_with_limit(client):
     assert len(data) <= 10
 
 
+def test_build_segments_invalid_clusters(client):
+    """Test que /segments valida el número de segmentos"""
+    response = client.post("/segments", json={"n_clusters": 1})
+    assert response.status_code == 422
+
+
 def test_batch_enrich_endpoint_no_file(client):
     """Test que /enrich/batch requiere archivo"""
     response = client.post("/enrich/batch")
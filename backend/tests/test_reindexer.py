@@ -0,0 +1,101 @@
+"""
+Tests del re-indexado de embeddings en background
+"""
+import pytest
+
+from config import settings
+from services.reindexer import ReindexService
+from services.vector_db import VectorDBService
+from tests.conftest import FakeEmbeddingModel, company_metadata
+
+
+def add_legacy(collection, metadatas):
+    """Agrega registros a la colección legacy con embeddings arbitrarios"""
+    collection.add(
+        ids=[m["name"] for m in metadatas],
+        embeddings=[[0.0] * FakeEmbeddingModel.DIM for _ in metadatas],
+        documents=[m["name"] for m in metadatas],
+        metadatas=metadatas
+    )
+
+
+@pytest.fixture
+def migrating_db(legacy_collection):
+    """VectorDBService con datos legacy pendientes de re-indexar"""
+    add_legacy(legacy_collection, [
+        company_metadata("Acme", industry="Fintech"),
+        company_metadata("Globex", industry="Logistics"),
+    ])
+    vector_db = VectorDBService()
+    assert vector_db.migrating
+    return vector_db
+
+
+@pytest.mark.asyncio
+async def test_reindex_batch_skips_records_already_in_target(migrating_db):
+    """Test que un re-index reanudado no re-procesa lo ya copiado"""
+    migrating_db.target_collection.upsert(
+        ids=["Acme"],
+        embeddings=[[1.0] * FakeEmbeddingModel.DIM],
+        documents=["kept"],
+        metadatas=[company_metadata("Acme")]
+    )
+    page = migrating_db.collection.get(include=["metadatas"])
+
+    reindexed, failed = await migrating_db.reindex_batch(
+        page["ids"], page["metadatas"])
+
+    assert (reindexed, failed) == (1, 0)
+    stored = migrating_db.target_collection.get(ids=["Acme"])
+    assert stored["documents"] == ["kept"]
+
+
+@pytest.mark.asyncio
+async def test_reindex_batch_does_not_resurrect_deleted_records(migrating_db):
+    """Test que la re-verificación bajo el lock descarta borrados recientes"""
+    page = migrating_db.collection.get(include=["metadatas"])
+    await migrating_db.delete_company("Globex")
+
+    reindexed, _ = await migrating_db.reindex_batch(page["ids"], page["metadatas"])
+
+    assert reindexed == 1
+    assert migrating_db.target_collection.get(ids=["Globex"])["ids"] == []
+
+
+@pytest.mark.asyncio
+async def test_run_cuts_over_and_deletes_source(migrating_db):
+    """Test que tras una pasada limpia se hace el cutover"""
+    reindexer = ReindexService(migrating_db)
+    reindexer.throttle = 0
+
+    assert reindexer.start()
+    assert reindexer.status.state == "running"
+    await reindexer._task
+
+    assert reindexer.status.state == "completed"
+    assert reindexer.status.reindexed == 2
+    assert reindexer.status.passes == 2
+    assert reindexer.status.processed == reindexer.status.total == 2
+    assert not migrating_db.migrating
+    names = [c.name for c in migrating_db.client.list_collections()]
+    assert settings.CHROMA_COLLECTION_NAME not in names
+    assert await migrating_db.search("fintech", limit=2)
+
+
+@pytest.mark.asyncio
+async def test_run_does_not_cut_over_with_failed_records(legacy_collection):
+    """Test que registros que fallan dejan el estado en failed sin cutover"""
+    add_legacy(legacy_collection, [
+        company_metadata("Acme"),
+        {"name": "Broken", "fit_score": 0.5, "raw_data": "not json"},
+    ])
+    vector_db = VectorDBService()
+    reindexer = ReindexService(vector_db)
+    reindexer.throttle = 0
+
+    reindexer.start()
+    await reindexer._task
+
+    assert reindexer.status.state == "failed"
+    assert reindexer.status.failed == 1
+    assert vector_db.migrating
@@ -0,0 +1,265 @@
+"""
+Tests de segmentación de leads con mini-batch k-means
+"""
+import asyncio
+
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from models.schemas import EnrichedCompany, SearchFilters, SegmentationRequest
+from services.segmentation import (
+    SegmentationService,
+    _kmeans_plus_plus,
+    _nearest,
+    _normalize
+)
+from services.vector_db import VectorDBService
+
+
+def make_blobs(n_blobs=4, per_blob=500, dim=32, noise=0.02, seed=0):
+    """Blobs normalizados y bien separados, con sus etiquetas reales"""
+    rng = np.random.default_rng(seed)
+    centers = _normalize(rng.normal(size=(n_blobs, dim)))
+    vectors = np.concatenate([
+        center + noise * rng.normal(size=(per_blob, dim)) for center in centers
+    ]).astype(np.float32)
+    truth = np.repeat(np.arange(n_blobs), per_blob)
+    order = rng.permutation(len(vectors))
+    return _normalize(vectors[order]), truth[order]
+
+
+def assert_recovers(labels, truth):
+    """Cada cluster encontrado corresponde exactamente a un blob real"""
+    pairs = set(zip(labels.tolist(), truth.tolist()))
+    assert len(pairs) == len(set(truth.tolist())) == len(set(labels.tolist()))
+
+
+def test_nearest_returns_closest_centroid_and_distance():
+    """Test que _nearest elige el centroide más cercano"""
+    centroids = np.array([[0.0, 0.0], [10.0, 0.0]])
+    vectors = np.array([[1.0, 0.0], [9.0, 1.0]])
+    labels, distances = _nearest(vectors, centroids)
+    assert labels.tolist() == [0, 1]
+    np.testing.assert_allclose(distances, [1.0, 2.0])
+
+
+def test_kmeans_plus_plus_seeds_one_centroid_per_blob():
+    """Test que el seeding reparte los centroides entre los blobs"""
+    vectors, truth = make_blobs()
+    centroids = _kmeans_plus_plus(vectors, 4, np.random.default_rng(0))
+    labels, _ = _nearest(vectors, centroids)
+    assert_recovers(labels, truth)
+
+
+def test_partial_fit_recovers_blobs_in_chunks():
+    """Test que mini-batch k-means por chunks recupera los blobs"""
+    vectors, truth = make_blobs()
+    centroids = _kmeans_plus_plus(vectors[:256], 4, np.random.default_rng(0))
+    counts = np.zeros(4)
+    for _ in range(2):
+        for i in range(0, len(vectors), 256):
+            centroids, counts = SegmentationService._partial_fit(
+                vectors[i:i + 256], centroids, counts)
+
+    labels, _ = _nearest(vectors, centroids)
+    assert_recovers(labels, truth)
+    assert counts.sum() == 2 * len(vectors)
+
+
+@pytest.fixture
+def vector_db(chroma_client):
+    return VectorDBService()
+
+
+async def add_companies(vector_db, names_by_industry):
+    """Agrega empresas cuyo texto depende sólo de la industria"""
+    for industry, names in names_by_industry.items():
+        for name in names:
+            await vector_db.add_company(EnrichedCompany(
+                name=name, industry=industry, fit_score=0.8))
+
+
+COMPANIES = {
+    "fintech payments banking": ["Acme", "Bolt", "Cash"],
+    "logistics shipping freight": ["Dray", "Echo", "Fleet"],
+}
+
+
+@pytest_asyncio.fixture
+async def segmented(vector_db):
+    await add_companies(vector_db, COMPANIES)
+    service = SegmentationService(vector_db)
+    await service._run(SegmentationRequest(n_clusters=2, epochs=3))
+    assert service.state == "ready"
+    return service
+
+
+def sizes(service):
+    return [s["size"] for s in service.stats]
+
+
+def segment_of(vector_db, name):
+    label_key, _, _ = vector_db.segment_labels
+    return vector_db.collection.get(ids=[name])["metadatas"][0][label_key]
+
+
+@pytest.mark.asyncio
+async def test_fit_caps_k_by_chunk_size(vector_db):
+    """Test que k no supera el tamaño del primer chunk"""
+    await add_companies(vector_db, COMPANIES)
+    service = SegmentationService(vector_db)
+    service.chunk_size = 2
+
+    centroids = await service._fit(
+        vector_db.collection, SegmentationRequest(n_clusters=5, epochs=1))
+
+    assert len(centroids) == 2
+
+
+@pytest.mark.asyncio
+async def test_run_labels_companies_without_touching_other_metadata(segmented):
+    """Test que el etiquetado sólo agrega claves de segmento"""
+    vector_db = segmented.vector_db
+    assert sorted(sizes(segmented)) == [3, 3]
+    assert segment_of(vector_db, "Acme") == segment_of(vector_db, "Cash")
+    assert segment_of(vector_db, "Acme") != segment_of(vector_db, "Dray")
+
+    metadata = vector_db.collection.get(ids=["Acme"])["metadatas"][0]
+    assert metadata["industry"] == "fintech payments banking"
+    assert "raw_data" in metadata
+
+
+@pytest.mark.asyncio
+async def test_relabel_moves_stats_between_segments(segmented):
+    """Test que re-enriquecer una empresa mueve su tamaño y fit_score"""
+    vector_db = segmented.vector_db
+    fintech = segment_of(vector_db, "Acme")
+    logistics = segment_of(vector_db, "Dray")
+
+    await vector_db.add_company(EnrichedCompany(
+        name="Acme", industry="logistics shipping freight", fit_score=0.2))
+    assert await segmented.assign_company("Acme") == logistics
+
+    assert segmented.stats[fintech]["size"] == 2
+    assert segmented.stats[logistics]["size"] == 4
+    assert segmented.stats[fintech]["fit_score_sum"] == pytest.approx(1.6)
+    assert segmented.stats[logistics]["fit_score_sum"] == pytest.approx(2.6)
+
+    # Asignar de nuevo (p.ej. callers coalescidos) no cuenta dos veces
+    await vector_db.add_company(EnrichedCompany(
+        name="Acme", industry="logistics shipping freight", fit_score=0.2))
+    await segmented.assign_company("Acme")
+    assert sorted(sizes(segmented)) == [2, 4]
+
+
+@pytest.mark.asyncio
+async def test_remove_company_updates_stats(segmented):
+    """Test que borrar una empresa la quita de su segmento"""
+    vector_db = segmented.vector_db
+    segment = segment_of(vector_db, "Dray")
+
+    await segmented.remove_company("Dray")
+
+    assert segmented.stats[segment]["size"] == 2
+    assert "Dray" not in [r[0] for r in segmented.stats[segment]["representatives"]]
+    assert vector_db.collection.get(ids=["Dray"])["ids"] == []
+
+
+@pytest.mark.asyncio
+async def test_companies_added_during_fit_are_assigned_afterwards(segmented):
+    """Test que las empresas enriquecidas durante un fit se encolan"""
+    vector_db = segmented.vector_db
+    segmented.state = "running"
+    await vector_db.add_company(EnrichedCompany(
+        name="Gyro", industry="fintech payments banking", fit_score=0.8))
+    assert await segmented.assign_company("Gyro") is None
+    assert segmented._pending == {"Gyro"}
+
+    await segmented._run(SegmentationRequest(n_clusters=2, epochs=3))
+
+    assert segmented._pending == set()
+    assert sorted(sizes(segmented)) == [3, 4]
+    assert segment_of(vector_db, "Gyro") == segment_of(vector_db, "Acme")
+
+
+@pytest.mark.asyncio
+async def test_failed_refit_keeps_previous_segmentation(segmented, monkeypatch):
+    """Test que un fit fallido no toca las etiquetas ni los stats activos"""
+    vector_db = segmented.vector_db
+    fit_id = segmented.fit_id
+    fintech = segment_of(vector_db, "Acme")
+
+    def fail(*args):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(segmented, "_save", fail)
+    await segmented._run(SegmentationRequest(n_clusters=2, epochs=3))
+
+    assert segmented.state == "failed"
+    assert segmented.fit_id == fit_id
+    assert segment_of(vector_db, "Acme") == fintech
+    assert sorted(sizes(segmented)) == [3, 3]
+
+    # El fit anterior sigue siendo consistente para asignar y borrar
+    await segmented.assign_company("Acme")
+    assert sorted(sizes(segmented)) == [3, 3]
+    await segmented.remove_company("Cash")
+    assert segmented.stats[fintech]["size"] == 2
+
+    # Y es el que se restaura al reiniciar
+    assert SegmentationService(vector_db).fit_id == fit_id
+
+
+@pytest.mark.asyncio
+async def test_refit_replaces_previous_segments_collection(segmented):
+    """Test que un nuevo fit se guarda en el otro slot y borra el anterior"""
+    vector_db = segmented.vector_db
+    previous = segmented.segments_collection.name
+
+    await segmented._run(SegmentationRequest(n_clusters=2, epochs=3))
+
+    assert segmented.segments_collection.name != previous
+    names = [c.name for c in vector_db.client.list_collections()]
+    assert previous not in names
+
+    restored = SegmentationService(vector_db)
+    assert restored.fit_id == segmented.fit_id
+    assert sorted(sizes(restored)) == [3, 3]
+
+
+@pytest.mark.asyncio
+async def test_start_reports_running(segmented):
+    """Test que start() deja el estado en running antes de retornar"""
+    assert segmented.start(SegmentationRequest(n_clusters=2, epochs=1))
+    assert segmented.get_segments().state == "running"
+    await segmented._task
+    assert segmented.state == "ready"
+
+
+@pytest.mark.asyncio
+async def test_search_filters_by_active_segment(segmented):
+    """Test que el filtro de segmento usa las etiquetas del fit activo"""
+    vector_db = segmented.vector_db
+    fintech = segment_of(vector_db, "Acme")
+
+    results = await vector_db.search(
+        "payments", limit=10, filters=SearchFilters(segment=fintech))
+
+    assert sorted(r.company.name for r in results) == ["Acme", "Bolt", "Cash"]
+
+
+@pytest.mark.asyncio
+async def test_cutover_waits_for_running_fit(segmented):
+    """Test que la migración no borra la colección mientras un fit la lee"""
+    vector_db = segmented.vector_db
+    await vector_db.scan_lock.acquire()
+    cutover = asyncio.create_task(vector_db.complete_migration())
+    await asyncio.sleep(0.05)
+    assert not cutover.done()
+
+    cutover.cancel()
+    vector_db.scan_lock.release()
+    with pytest.raises(asyncio.CancelledError):
+        await cutover
+    assert vector_db.collection.count() == 6
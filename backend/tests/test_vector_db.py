@@ -0,0 +1,65 @@
+"""
+Tests de búsqueda semántica en lote
+"""
+import pytest
+import pytest_asyncio
+from chromadb.api.models.Collection import Collection
+
+from models.schemas import EnrichedCompany, SearchFilters, SearchQuery
+from services.vector_db import VectorDBService
+
+
+@pytest_asyncio.fixture
+async def vector_db(chroma_client):
+    vector_db = VectorDBService()
+    companies = [
+        ("Acme", "fintech payments", 0.9),
+        ("Bolt", "fintech payments", 0.4),
+        ("Cash", "fintech lending", 0.8),
+        ("Dray", "logistics freight", 0.9),
+        ("Echo", "logistics shipping", 0.3),
+    ]
+    for name, industry, fit_score in companies:
+        await vector_db.add_company(
+            EnrichedCompany(name=name, industry=industry, fit_score=fit_score))
+    return vector_db
+
+
+@pytest.mark.asyncio
+async def test_search_bulk_groups_by_filters_and_trims_per_query(vector_db, monkeypatch):
+    """Test que /search/bulk agrupa por filtros y respeta cada limit"""
+    encode_calls, query_calls = [], []
+
+    encode = vector_db.embedding_model.encode
+    vector_db.embedding_model.encode = lambda texts, **kw: (
+        encode_calls.append(texts) or encode(texts, **kw))
+
+    query = Collection.query
+    monkeypatch.setattr(Collection, "query", lambda self, **kw: (
+        query_calls.append(kw) or query(self, **kw)))
+
+    fintech = SearchFilters(industry="fintech payments")
+    queries = [
+        SearchQuery(query="fintech payments", limit=1),
+        SearchQuery(query="logistics freight", limit=4),
+        SearchQuery(query="payments", limit=5, filters=fintech),
+        SearchQuery(query="fintech", limit=2, filters=SearchFilters(min_fit_score=0.8)),
+        SearchQuery(query="shipping", limit=1, filters=fintech),
+    ]
+
+    grouped = await vector_db.search_bulk(queries)
+
+    assert len(encode_calls) == 1
+    assert len(query_calls) == 3
+    assert [len(results) for results in grouped] == [1, 4, 2, 2, 1]
+
+    # Mismo ranking que las queries individuales (por score: el encoder de
+    # test produce empates cuyo orden depende de n_results)
+    for q, results in zip(queries, grouped):
+        single = await vector_db.search(q.query, limit=q.limit, filters=q.filters)
+        assert [r.similarity_score for r in results] == pytest.approx(
+            [r.similarity_score for r in single])
+
+    assert grouped[1][0].company.name == "Dray"
+    assert {r.company.name for r in grouped[2]} == {"Acme", "Bolt"}
+    assert all(r.company.fit_score >= 0.8 for r in grouped[3])
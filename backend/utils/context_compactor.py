@@ -0,0 +1,167 @@
+"""
+Prompt context compaction for scraped website content
+"""
+from typing import Dict, List, Optional
+from collections import Counter
+import math
+import re
+
+from config import settings
+
+
+# Rough chars-per-token ratio for English text with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+# Long runs without punctuation (menus, footers) are split into windows
+MAX_SEGMENT_WORDS = 40
+
+# The analyzer used to send the first 1000 characters of page text;
+# savings are reported against that prompt
+LEGACY_CONTENT_CHARS = 1000
+
+# Cookie and consent banners, wherever they appear in a segment
+CONSENT_PATTERN = re.compile(
+    r"we use cookies|(this|our) (web)?site uses cookies|accept (all )?cookies|"
+    r"cookie (policy|settings|preferences)|manage (cookies|consent)|"
+    r"by (continuing|clicking|using)\b.{0,40}\b(agree|consent|cookies)",
+    re.IGNORECASE
+)
+
+# Footer and account links, only dropped in short segments so real
+# sentences mentioning e.g. a newsletter product are kept
+SHORT_BOILERPLATE_PATTERN = re.compile(
+    r"©|all rights reserved|privacy policy|terms of (service|use)|"
+    r"skip to (main )?content|sign (in|up)|log ?in|subscribe|newsletter|accept all",
+    re.IGNORECASE
+)
+SHORT_SEGMENT_WORDS = 12
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can do for from has have how in into is it
+its more most not of on or our out so than that the their them then there
+these they this to up us was we were what when which who will with you your
+""".split())
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate, good enough for budgeting"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+class ContextCompactor:
+    """Packs the most informative scraped sentences into a token budget"""
+
+    def __init__(self, token_budget: Optional[int] = None):
+        self.token_budget = token_budget or settings.AI_CONTEXT_TOKEN_BUDGET
+
+    def _split_segments(self, text: str) -> List[str]:
+        """Split text into sentences, windowing long unpunctuated runs"""
+        segments = []
+        for sentence in re.split(r"(?<=[.!?])\s+", text):
+            words = sentence.split()
+            for i in range(0, len(words), MAX_SEGMENT_WORDS):
+                segment = " ".join(words[i:i + MAX_SEGMENT_WORDS])
+                if segment:
+                    segments.append(segment)
+        return segments
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return re.sub(r"\W+", " ", text.lower()).strip()
+
+    @staticmethod
+    def _words(text: str) -> List[str]:
+        return re.findall(r"[a-z][a-z'-]+|\d+", text.lower())
+
+    def _score(self, segment: str, term_freq: Counter) -> float:
+        """
+        Informativeness of a segment
+
+        Favors prose (a normal share of stopwords, few Title Case tokens)
+        made of terms that recur across the page, over menus and banners.
+        """
+        words = self._words(segment)
+        if len(words) < 4 or CONSENT_PATTERN.search(segment):
+            return 0.0
+        if len(words) <= SHORT_SEGMENT_WORDS and SHORT_BOILERPLATE_PATTERN.search(segment):
+            return 0.0
+
+        content = [w for w in words if w not in STOPWORDS and len(w) > 2]
+        if not content:
+            return 0.0
+
+        unique = set(content)
+        salience = sum(math.log1p(term_freq[w]) for w in unique) / len(unique)
+        diversity = len(unique) / len(content)
+
+        stopword_ratio = 1 - len(content) / len(words)
+        prose = min(1.0, stopword_ratio / 0.25)
+
+        tokens = segment.split()
+        title_ratio = sum(1 for t in tokens if t[:1].isupper()) / len(tokens)
+        nav_penalty = 1 - max(0.0, title_ratio - 0.5)
+
+        length = min(1.0, len(words) / 8)
+        facts = 1.1 if any(c.isdigit() for c in segment) else 1.0
+
+        return salience * diversity * (0.3 + 0.7 * prose) * nav_penalty * length * facts
+
+    def compact(self, website_data: Dict[str, str]) -> Dict:
+        """
+        Compact scraped website data to fit the token budget
+
+        Title and description are kept as-is. Text content is deduplicated
+        (including against the title and description), stripped of
+        boilerplate, ranked, and packed best-first into the remaining budget
+        in original page order.
+
+        Returns:
+            website_data with compacted 'text_content', plus
+            'tokens_scraped' (all scraped text), 'tokens_after' (sent to
+            the model) and 'tokens_saved' (vs. the old fixed
+            LEGACY_CONTENT_CHARS cut)
+        """
+        title = website_data.get('title') or ""
+        description = website_data.get('description') or ""
+        text = website_data.get('text_content') or ""
+
+        header_tokens = estimate_tokens(title) + estimate_tokens(description)
+        tokens_scraped = header_tokens + estimate_tokens(text)
+        tokens_baseline = header_tokens + estimate_tokens(text[:LEGACY_CONTENT_CHARS])
+        remaining = self.token_budget - header_tokens
+
+        seen = {self._normalize(title), self._normalize(description)}
+        segments = []
+        for segment in self._split_segments(text):
+            key = self._normalize(segment)
+            if key and key not in seen:
+                seen.add(key)
+                segments.append(segment)
+
+        term_freq = Counter(
+            w for s in segments for w in self._words(s) if w not in STOPWORDS
+        )
+        ranked = sorted(
+            ((self._score(s, term_freq), i) for i, s in enumerate(segments)),
+            reverse=True
+        )
+
+        selected = []
+        for score, i in ranked:
+            if score <= 0 or remaining <= 0:
+                break
+            cost = estimate_tokens(segments[i]) + 1
+            if cost <= remaining:
+                selected.append(i)
+                remaining -= cost
+
+        text_content = " ".join(segments[i] for i in sorted(selected))
+        tokens_after = header_tokens + estimate_tokens(text_content)
+
+        return {
+            **website_data,
+            'text_content': text_content,
+            'tokens_scraped': tokens_scraped,
+            'tokens_after': tokens_after,
+            'tokens_saved': max(0, tokens_baseline - tokens_after)
+        }
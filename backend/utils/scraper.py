@@ -41,7 +41,8 @@ class WebScraper:
                 description = meta_desc.get(
                     'content', '').strip() if meta_desc else ""
 
-                # Extract visible text (first 2000 chars)
+                # Extract visible text (first 10000 chars, compacted later
+                # to the prompt token budget)
                 # Remove scripts and styles
                 for script in soup(["script", "style"]):
                     script.decompose()
@@ -51,7 +52,7 @@ class WebScraper:
                 chunks = (phrase.strip()
                           for line in lines for phrase in line.split("  "))
                 text_content = ' '.join(
-                    chunk for chunk in chunks if chunk)[:2000]
+                    chunk for chunk in chunks if chunk)[:10000]
 
                 return {
                     'title': title_text,